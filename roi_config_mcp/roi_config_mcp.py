@@ -10,13 +10,21 @@ SECURITY FEATURES:
 """
 
 import os
+import re
 import json
+import asyncio
+import shutil
+import tempfile
 import hashlib
+import threading
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Literal
 from enum import Enum
 from pathlib import Path
+from types import MappingProxyType
+from itertools import islice
 
+import orjson
 from pydantic import BaseModel, Field, ConfigDict
 from mcp.server.fastmcp import FastMCP
 
@@ -32,32 +40,111 @@ if os.environ.get("ROI_CONFIG_PATH"):
 
 mcp = FastMCP("roi_config_mcp")
 
+# roi_config_read section name -> top-level config key
+_SECTION_MAP = MappingProxyType({"gpuTypes": "gpuTypes", "hardware": "hardware",
+                                 "models": "modelArchitectures", "storage": "storageOptions"})
+_MAX_LISTED_CHANGES = 20
+_VERSION_RE = re.compile(r"(\d+)\.(\d+)\.(\d+)", re.ASCII)
+_PREVIEW_LIMIT = 3000
+_APPLY_LOCK = asyncio.Lock()
+
 def _validate_file_access():
     return os.path.isfile(ALLOWED_CONFIG_FILE)
 
-def _get_file_hash():
+# Raw bytes, parsed config and short hash, keyed on (st_mtime_ns, st_size) of
+# the file. Tool handlers read it from worker threads, so fills happen under
+# _CACHE_LOCK.
+_CACHE = {"key": None, "data": None, "config": None, "hash": None}
+_CACHE_LOCK = threading.Lock()
+
+def _refresh_cache():
+    # Caller must hold _CACHE_LOCK
+    st = os.stat(ALLOWED_CONFIG_FILE)
+    key = (st.st_mtime_ns, st.st_size)
+    if _CACHE["key"] != key:
+        with open(ALLOWED_CONFIG_FILE, "rb") as f:
+            data = f.read()
+        _CACHE["config"] = orjson.loads(data)
+        _CACHE["data"] = data
+        _CACHE["hash"] = hashlib.sha256(data).hexdigest()[:12]
+        _CACHE["key"] = key
+
+def _load_config():
+    with _CACHE_LOCK:
+        _refresh_cache()
+        return _CACHE["config"], _CACHE["hash"]
+
+def _load_config_copy():
+    # Re-parsing the cached bytes is cheaper than deep-copying the cached dict
+    with _CACHE_LOCK:
+        _refresh_cache()
+        data = _CACHE["data"]
+    return orjson.loads(data)
+
+def _read_config_and_hash():
     if not _validate_file_access():
-        return ""
-    with open(ALLOWED_CONFIG_FILE, "rb") as f:
-        return hashlib.sha256(f.read()).hexdigest()[:12]
+        raise FileNotFoundError(f"Config file not found: {ALLOWED_CONFIG_FILE}")
+    return _load_config()
 
 def _read_config():
+    return _read_config_and_hash()[0]
+
+def _read_config_for_update():
     if not _validate_file_access():
         raise FileNotFoundError(f"Config file not found: {ALLOWED_CONFIG_FILE}")
-    with open(ALLOWED_CONFIG_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return _load_config_copy()
 
 def _write_config(config, backup=True):
     if not _validate_file_access():
         raise FileNotFoundError(f"Config file not found: {ALLOWED_CONFIG_FILE}")
-    if backup:
-        backup_path = ALLOWED_CONFIG_FILE + f".backup-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
-        with open(ALLOWED_CONFIG_FILE, "r", encoding="utf-8") as f:
-            backup_content = f.read()
-        with open(backup_path, "w", encoding="utf-8") as f:
-            f.write(backup_content)
-    with open(ALLOWED_CONFIG_FILE, "w", encoding="utf-8") as f:
-        json.dump(config, f, indent=2)
+    # Write to a temp file next to the real target (through any symlink in
+    # ROI_CONFIG_PATH) and swap it in, so a crash never leaves a partially
+    # written config behind.
+    target = os.path.realpath(ALLOWED_CONFIG_FILE)
+    target_dir = os.path.dirname(target)
+    # stdlib json, not orjson, so non-ASCII is written as \uXXXX escapes exactly
+    # like the checked-in file and scripts/weekly_update.py. NaN/Infinity are
+    # rejected because _load_config parses with orjson, which does not accept them.
+    data = json.dumps(config, indent=2, allow_nan=False).encode("utf-8")
+    fd, tmp_path = tempfile.mkstemp(dir=target_dir, prefix=os.path.basename(target) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            # os.replace keeps mtime and size, so this key matches the renamed file
+            st = os.fstat(f.fileno())
+        key = (st.st_mtime_ns, st.st_size)
+        shutil.copymode(target, tmp_path)
+        if backup:
+            backup_path = target + f".backup-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+            # The original inode is detached by os.replace, so a hardlink is a full snapshot
+            try:
+                os.link(target, backup_path)
+            except OSError:
+                shutil.copyfile(target, backup_path)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.remove(tmp_path)
+        with _CACHE_LOCK:
+            _CACHE["key"] = None
+        raise
+    # Make the rename itself durable; best effort, since some filesystems
+    # cannot fsync a directory and the new config is already in place
+    try:
+        dir_fd = os.open(target_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+    # Prime the cache with what was just written so the next read/status is free
+    with _CACHE_LOCK:
+        _CACHE["config"] = config
+        _CACHE["data"] = data
+        _CACHE["hash"] = hashlib.sha256(data).hexdigest()[:12]
+        _CACHE["key"] = key
     return f"Config saved. Backup: {backup_path if backup else 'None'}"
 
 class ResponseFormat(str, Enum):
@@ -79,35 +166,35 @@ class ApplyUpdateInput(BaseModel):
     user_confirmed: bool = Field(...)
     create_backup: bool = Field(default=True)
 
+class UpdatesPayload(BaseModel):
+    version_increment: Optional[Literal["patch", "minor"]] = Field(default=None)
+    gpuTypes_updates: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    modelArchitectures_updates: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+
 @mcp.tool(name="roi_config_read")
 async def roi_config_read(params: ReadConfigInput) -> str:
     """Read the ROI calculator configuration file."""
     try:
-        config = _read_config()
-        file_hash = _get_file_hash()
+        config, file_hash = await asyncio.to_thread(_read_config_and_hash)
         if params.section:
-            section_map = {"gpuTypes": "gpuTypes", "hardware": "hardware", 
-                          "models": "modelArchitectures", "storage": "storageOptions"}
             if params.section == "metadata":
                 data = {"version": config.get("version"), "lastUpdated": config.get("lastUpdated")}
-            elif params.section in section_map:
-                data = config.get(section_map[params.section], {})
+            elif params.section in _SECTION_MAP:
+                data = config.get(_SECTION_MAP[params.section], {})
             else:
                 return f"Error: Unknown section"
         else:
             data = config
         if params.response_format == ResponseFormat.JSON:
-            return json.dumps({"file_hash": file_hash, "data": data}, indent=2)
-        return f"# ROI Config
-Version: {config.get('version')}
-" + json.dumps(data, indent=2)[:3000]
+            return orjson.dumps({"file_hash": file_hash, "data": data}, option=orjson.OPT_INDENT_2).decode()
+        return f"# ROI Config\nVersion: {config.get('version')}\n" + orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()[:_PREVIEW_LIMIT]
     except Exception as e:
         return f"Error: {e}"
 
 @mcp.tool(name="roi_config_research")
 async def roi_config_research(params: UpdatePreviewInput) -> str:
     """Research latest pricing and specs for ROI config categories."""
-    config = _read_config()
+    config = await asyncio.to_thread(_read_config)
     return f"""# Research Request
 Version: {config.get('version')}
 Date: {datetime.now().strftime('%Y-%m-%d')}
@@ -127,14 +214,24 @@ async def roi_config_apply(params: ApplyUpdateInput) -> str:
     if not params.user_confirmed:
         return "ERROR: Set user_confirmed=True to proceed"
     try:
-        updates = json.loads(params.updates_json)
-        config = _read_config()
+        updates = UpdatesPayload.model_validate_json(params.updates_json)
+    except Exception as e:
+        return f"Error: {e}"
+    # Serialize read-modify-write so concurrent applies cannot drop each other's changes
+    async with _APPLY_LOCK:
+        return await _apply_updates(updates, params.create_backup)
+
+async def _apply_updates(updates, create_backup):
+    try:
+        config = await asyncio.to_thread(_read_config_for_update)
         old_version = config.get("version", "1.0.0")
         changes = []
-        if updates.get("version_increment"):
-            parts = old_version.split(".")
-            major, minor, patch = int(parts[0]), int(parts[1]), int(parts[2])
-            if updates["version_increment"] == "minor":
+        if updates.version_increment:
+            m = _VERSION_RE.fullmatch(old_version)
+            if not m:
+                raise ValueError(f"Malformed config version: {old_version!r}")
+            major, minor, patch = map(int, m.groups())
+            if updates.version_increment == "minor":
                 minor += 1
                 patch = 0
             else:
@@ -142,40 +239,49 @@ async def roi_config_apply(params: ApplyUpdateInput) -> str:
             config["version"] = f"{major}.{minor}.{patch}"
             changes.append(f"Version: {old_version} -> {config['version']}")
         config["lastUpdated"] = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
-        for gpu, data in updates.get("gpuTypes_updates", {}).items():
+        # Only the first _MAX_LISTED_CHANGES entries are formatted for the summary
+        n_changes = len(changes)
+        for gpu, data in updates.gpuTypes_updates.items():
             if gpu in config.get("gpuTypes", {}):
-                for k, v in data.items():
-                    config["gpuTypes"][gpu][k] = v
-                    changes.append(f"gpuTypes.{gpu}.{k}: {v}")
-        for model, data in updates.get("modelArchitectures_updates", {}).items():
+                config["gpuTypes"][gpu].update(data)
+                n_changes += len(data)
+                if len(changes) < _MAX_LISTED_CHANGES:
+                    changes.extend(f"gpuTypes.{gpu}.{k}: {v}"
+                                   for k, v in islice(data.items(), _MAX_LISTED_CHANGES - len(changes)))
+        for model, data in updates.modelArchitectures_updates.items():
             if model in config.get("modelArchitectures", {}):
-                for k, v in data.items():
-                    config["modelArchitectures"][model][k] = v
-                    changes.append(f"models.{model}.{k}: {v}")
-        result = _write_config(config, backup=params.create_backup)
-        return f"# Update Applied
-Changes: {len(changes)}
-{result}
-" + "
-".join(f"- {c}" for c in changes[:20])
+                config["modelArchitectures"][model].update(data)
+                n_changes += len(data)
+                if len(changes) < _MAX_LISTED_CHANGES:
+                    changes.extend(f"models.{model}.{k}: {v}"
+                                   for k, v in islice(data.items(), _MAX_LISTED_CHANGES - len(changes)))
+        result = await asyncio.to_thread(_write_config, config, create_backup)
+        return f"# Update Applied\nChanges: {n_changes}\n{result}\n" + "\n".join(f"- {c}" for c in changes)
     except Exception as e:
         return f"Error: {e}"
 
 @mcp.tool(name="roi_config_status")
 async def roi_config_status() -> str:
     """Get status of the ROI config file and MCP server."""
-    status = {"file": ALLOWED_CONFIG_FILE, "exists": _validate_file_access()}
-    if status["exists"]:
-        config = _read_config()
+    # Answered from the mtime+size cache; only a changed file is re-parsed
+    status = {"file": ALLOWED_CONFIG_FILE, "exists": True}
+    try:
+        config, _ = await asyncio.to_thread(_read_config_and_hash)
+    except FileNotFoundError:
+        status["exists"] = False
+    except ValueError as e:
+        status["error"] = f"Config is not valid JSON: {e}"
+    else:
         status["version"] = config.get("version")
         status["gpus"] = len(config.get("gpuTypes", {}))
         status["models"] = len(config.get("modelArchitectures", {}))
+    error = f"\nError: {status['error']}" if "error" in status else ""
     return f"""# ROI Config MCP Status
 File: {status['file']}
 Exists: {status['exists']}
 Version: {status.get('version', 'N/A')}
 GPUs: {status.get('gpus', 0)}
-Models: {status.get('models', 0)}
+Models: {status.get('models', 0)}{error}
 Security: Single file access only, requires confirmation for writes"""
 
 if __name__ == "__main__":
@@ -5,12 +5,15 @@ Uses Claude API to research and update GPU pricing and model information.
 """
 
 import os
+import re
 import json
 import anthropic
 from datetime import datetime
+from pathlib import Path
 
 CONFIG_FILE = 'roi-config Rev 08.json'
 HTML_FILE = 'F5_DPU_ROI_Calculator_F5Branded_v2.8_optimized.html'
+VERSION_RE = re.compile(r"(\d+)\.(\d+)\.(\d+)", re.ASCII)
 
 UPDATE_PROMPT = """You are updating an F5 DPU ROI Calculator configuration file.
 
@@ -29,11 +32,18 @@ Return ONLY a JSON object with:
 }
 """
 
+_CLIENT = None
+
+def get_client():
+    """Return a shared Anthropic client so its connection pool is reused."""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = anthropic.Anthropic()
+    return _CLIENT
+
 def get_claude_updates(current_config):
     """Call Claude API to get update recommendations."""
-    client = anthropic.Anthropic()
-
-    message = client.messages.create(
+    message = get_client().messages.create(
         model="claude-sonnet-4-20250514",
         max_tokens=4096,
         messages=[{
@@ -48,7 +58,8 @@ def get_claude_updates(current_config):
     response_text = message.content[0].text
     try:
         if "```json" in response_text:
-            json_str = response_text.split("```json")[1].split("```")[0]
+            _, _, rest = response_text.partition("```json")
+            json_str, _, _ = rest.partition("```")
         else:
             json_str = response_text
         return json.loads(json_str.strip())
@@ -58,9 +69,9 @@ def get_claude_updates(current_config):
 
 def increment_version(version, increment_type="patch"):
     """Increment semantic version."""
-    parts = version.split(".")
-    if len(parts) == 3:
-        major, minor, patch = int(parts[0]), int(parts[1]), int(parts[2])
+    m = VERSION_RE.fullmatch(version)
+    if m:
+        major, minor, patch = map(int, m.groups())
         if increment_type == "minor":
             minor += 1
             patch = 0
@@ -93,8 +104,7 @@ def main():
         print(f"Error: Config file not found: {CONFIG_FILE}")
         return 1
 
-    with open(CONFIG_FILE, "r") as f:
-        config = json.load(f)
+    config = json.loads(Path(CONFIG_FILE).read_bytes())
 
     print(f"Current version: {config.get('version', 'unknown')}")
 
@@ -107,7 +117,7 @@ def main():
 
         if changes_made:
             with open(CONFIG_FILE, "w") as f:
-                json.dump(config, f, indent=2)
+                f.write(json.dumps(config, indent=2))
             print(f"Saved updates to {CONFIG_FILE}")
         else:
             print("No changes were needed")